@@ -4,28 +4,219 @@ FastAPI 應用程式 - Instagram 貼文提取器 API
 """
 import sys
 import os
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, TYPE_CHECKING
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
 import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import asynccontextmanager
-import instaloader
 
-# 添加專案根目錄到 Python 路徑
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 添加專案根目錄到 Python 路徑（Docker/腳本執行時仍需要）
+_project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
 
 # 導入我們的模組
-from src.instagram.extractor import InstagramExtractor
+# InstagramExtractor 會連帶載入 instaloader/requests 等重量級套件，
+# 延後到第一次建立提取器時才匯入，加快每個 worker 的啟動
 from src.models.models import PostData, ExtractResult, UserProfile
 from config.settings import Config
 
+if TYPE_CHECKING:
+    from src.instagram.extractor import InstagramExtractor
+
 # 設定日誌
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=Config.LOG_LEVEL.upper(), format=Config.LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
-# 全域變數存儲提取器實例
-extractor_instances = {}
+# 提取器快取設定
+EXTRACTOR_CACHE_SIZE = 32
+EXTRACTOR_IDLE_SECONDS = 30 * 60
+EXTRACTOR_EVICT_INTERVAL = 10 * 60
+
+# 背景提取的 process pool 大小（消費者任務數與之對齊）
+EXTRACT_POOL_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class ExtractorCache:
+    """有上限的 LRU 提取器快取
+
+    超過容量時淘汰最久未使用的提取器並呼叫其 close()，
+    避免忘記登出的使用者讓 Instaloader 實例與資料庫連線無限累積。
+    """
+
+    def __init__(self, maxsize: int = EXTRACTOR_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._cache: OrderedDict = OrderedDict()
+        self._last_used: dict = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, username: str, factory):
+        """取得提取器，不存在時以 factory 建立；必要時淘汰最舊的實例"""
+        evicted = []
+        with self._lock:
+            extractor = self._cache.get(username)
+            if extractor is None:
+                extractor = factory()
+                self._cache[username] = extractor
+            else:
+                self._cache.move_to_end(username)
+            self._last_used[username] = time.monotonic()
+
+            while len(self._cache) > self.maxsize:
+                name, old = self._cache.popitem(last=False)
+                self._last_used.pop(name, None)
+                evicted.append((name, old))
+
+        for name, old in evicted:
+            self._close_quietly(name, old)
+        return extractor
+
+    def pop(self, username: str):
+        """移除並回傳提取器（不存在時回傳 None），由呼叫端負責 close"""
+        with self._lock:
+            self._last_used.pop(username, None)
+            return self._cache.pop(username, None)
+
+    def evict_idle(self, max_idle_seconds: int = EXTRACTOR_IDLE_SECONDS) -> int:
+        """淘汰閒置超過 max_idle_seconds 的提取器，回傳淘汰數量"""
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            for name in [n for n, t in self._last_used.items()
+                         if now - t > max_idle_seconds]:
+                evicted.append((name, self._cache.pop(name)))
+                self._last_used.pop(name, None)
+
+        for name, old in evicted:
+            self._close_quietly(name, old)
+        return len(evicted)
+
+    def close_all(self):
+        """關閉並清空所有提取器"""
+        with self._lock:
+            items = list(self._cache.items())
+            self._cache.clear()
+            self._last_used.clear()
+        for name, extractor in items:
+            self._close_quietly(name, extractor)
+
+    def _close_quietly(self, username: str, extractor):
+        try:
+            extractor.close()
+        except Exception as e:
+            logger.error("清理提取器 %s 時發生錯誤: %s", username, e)
+
+
+# 全域提取器快取
+extractor_cache = ExtractorCache()
+
+# 讀取端點的 in-process TTL 快取（key 格式: "<endpoint>:<username>[:參數]"）
+CACHE_TTL_SECONDS = 30
+# 快取項目數上限；/posts 的 key 含分頁參數，不設上限會隨請求組合無限成長
+RESPONSE_CACHE_MAX = 1024
+_response_cache: dict = {}
+
+
+def _cache_get(key: str):
+    """取得尚未過期的快取值，過期則順手清除"""
+    entry = _response_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if time.monotonic() >= expires_at:
+        _response_cache.pop(key, None)
+        return None
+    return value
+
+
+def _cache_sweep() -> int:
+    """清除所有已過期的快取項，回傳清除數"""
+    now = time.monotonic()
+    stale = [k for k, (expires_at, _) in _response_cache.items() if now >= expires_at]
+    for key in stale:
+        _response_cache.pop(key, None)
+    return len(stale)
+
+
+def _cache_set(key: str, value):
+    if key not in _response_cache and len(_response_cache) >= RESPONSE_CACHE_MAX:
+        _cache_sweep()
+        # 清完過期項仍滿則淘汰最舊寫入的項目（dict 保留插入順序）
+        while len(_response_cache) >= RESPONSE_CACHE_MAX:
+            _response_cache.pop(next(iter(_response_cache)))
+    _response_cache[key] = (time.monotonic() + CACHE_TTL_SECONDS, value)
+
+
+def _cache_invalidate(username: str):
+    """清除某使用者所有被快取的讀取回應"""
+    stale = [k for k in _response_cache if k.split(":", 2)[1] == username]
+    for key in stale:
+        _response_cache.pop(key, None)
+
+
+async def _current_etag(extractor) -> str:
+    """以貼文筆數 + 最後更新時間產生弱一致的 ETag"""
+    version = await asyncio.to_thread(extractor.db_manager.get_data_version)
+    return hashlib.blake2b(version.encode(), digest_size=8).hexdigest()
+
+
+def _run_extract(username: str, database_file: str) -> dict:
+    """在子行程中執行提取（ProcessPoolExecutor 需要可 pickle 的頂層函式）"""
+    from src.instagram.extractor import InstagramExtractor
+
+    extractor = InstagramExtractor(
+        username=username,
+        database_file=database_file
+    )
+    try:
+        extractor.init_database()
+        if not extractor.auth_manager.login_from_session():
+            return ExtractResult(
+                success=False, username=username, error="無法載入已保存的 session"
+            ).to_dict()
+        return extractor.extract_saved_posts().to_dict()
+    finally:
+        extractor.close()
+
+
+async def _idle_eviction_loop():
+    """定期淘汰閒置的提取器，釋放連線與記憶體"""
+    while True:
+        await asyncio.sleep(EXTRACTOR_EVICT_INTERVAL)
+        evicted = extractor_cache.evict_idle()
+        if evicted:
+            logger.info("已淘汰 %s 個閒置提取器", evicted)
+        # 順手清掉過期的回應快取，避免只寫不讀的 key 留在記憶體
+        swept = _cache_sweep()
+        if swept:
+            logger.info("已清除 %s 筆過期回應快取", swept)
+
+
+async def _extract_worker(app: FastAPI):
+    """消化提取佇列，把工作送進 process pool"""
+    loop = asyncio.get_running_loop()
+    while True:
+        username, database_file = await app.state.extract_queue.get()
+        try:
+            result = await loop.run_in_executor(
+                app.state.extract_pool, _run_extract, username, database_file
+            )
+            logger.info("提取完成: %s", result)
+            _cache_invalidate(username)
+        except Exception as e:
+            logger.error("背景提取失敗: %s", e)
+        finally:
+            app.state.extract_queue.task_done()
 
 # Pydantic 模型
 class LoginRequest(BaseModel):
@@ -61,15 +252,23 @@ class BatchDeletePostRequest(BaseModel):
 async def lifespan(app: FastAPI):
     # 啟動時
     logger.info("FastAPI 應用程式啟動")
+    app.state.extract_pool = ProcessPoolExecutor(max_workers=EXTRACT_POOL_WORKERS)
+    app.state.extract_queue = asyncio.Queue()
+    # 每個 pool worker 配一個消費者任務；單一消費者會逐件 await，
+    # 多位使用者的提取就排不進其餘的 worker 行程
+    extract_workers = [
+        asyncio.create_task(_extract_worker(app))
+        for _ in range(EXTRACT_POOL_WORKERS)
+    ]
+    idle_evictor = asyncio.create_task(_idle_eviction_loop())
     yield
     # 關閉時
     logger.info("正在清理資源...")
-    for extractor in extractor_instances.values():
-        try:
-            extractor.close()
-        except Exception as e:
-            logger.error(f"清理提取器時發生錯誤: {e}")
-    extractor_instances.clear()
+    for worker in extract_workers:
+        worker.cancel()
+    idle_evictor.cancel()
+    app.state.extract_pool.shutdown(wait=False, cancel_futures=True)
+    extractor_cache.close_all()
     logger.info("FastAPI 應用程式關閉")
 
 # 建立 FastAPI 應用程式
@@ -81,15 +280,33 @@ app = FastAPI(
 )
 
 # 依賴函數
-def get_extractor(username: str) -> InstagramExtractor:
+def _encode_cursor(*parts) -> str:
+    """把 keyset 分頁的排序鍵編成不透明的 cursor 字串"""
+    return base64.urlsafe_b64encode(json.dumps(parts).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    """解碼 cursor，格式錯誤時回應 400"""
+    try:
+        parts = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return tuple(parts)
+    except (ValueError, TypeError, binascii.Error):
+        # TypeError：base64 合法但內容不是 JSON 陣列（如單一數值）
+        raise HTTPException(status_code=400, detail="無效的 cursor")
+
+
+def get_extractor(username: str) -> "InstagramExtractor":
     """獲取或建立提取器實例"""
-    if username not in extractor_instances:
-        extractor_instances[username] = InstagramExtractor(
+    from src.instagram.extractor import InstagramExtractor
+
+    return extractor_cache.get_or_create(
+        username,
+        lambda: InstagramExtractor(
             username=username,
             database_file=Config.get_database_path(username),
             logger=logger
         )
-    return extractor_instances[username]
+    )
 
 # API 路由
 
@@ -128,7 +345,7 @@ async def verify_2fa(username: str, request: TwoFactorRequest):
             }
 
         # 直接使用 2FA 驗證碼進行登入
-        success = extractor.auth_manager.verify_2fa(request.two_factor_code)
+        success = await asyncio.to_thread(extractor.auth_manager.verify_2fa, request.two_factor_code)
 
         if success:
             return {
@@ -142,21 +359,23 @@ async def verify_2fa(username: str, request: TwoFactorRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"2FA 驗證時發生錯誤: {e}")
+        logger.error("2FA 驗證時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"2FA 驗證時發生錯誤: {str(e)}")
 
 @app.post("/login")
 async def login(request: LoginRequest):
     """登入 Instagram"""
+    import instaloader
+
     try:
         extractor = get_extractor(request.username)
 
         # 初始化資料庫
-        if not extractor.init_database():
+        if not await asyncio.to_thread(extractor.init_database):
             raise HTTPException(status_code=500, detail="資料庫初始化失敗")
 
         # 登入
-        success = extractor.login(request.password)
+        success = await asyncio.to_thread(extractor.login, request.password)
 
         if success:
             return {
@@ -176,33 +395,48 @@ async def login(request: LoginRequest):
             "next_step": f"POST /verify-2fa/{request.username}"
         }
     except Exception as e:
-        logger.error(f"登入時發生錯誤: {e}")
+        logger.error("登入時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"登入時發生錯誤: {str(e)}")
 
 @app.get("/profile/{username}")
-async def get_profile(username: str) -> UserProfile:
+async def get_profile(username: str, request: Request, response: Response) -> UserProfile:
     """獲取使用者個人檔案"""
     try:
         extractor = get_extractor(username)
-        
+
         if not extractor.auth_manager.is_logged_in:
             raise HTTPException(status_code=401, detail="尚未登入")
-        
-        profile_info = extractor.get_profile_info()
-        
+
+        cache_key = f"profile:{username}"
+        profile_info = _cache_get(cache_key)
         if profile_info is None:
-            raise HTTPException(status_code=404, detail="找不到使用者個人檔案")
-        
+            profile_info = await asyncio.to_thread(extractor.get_profile_info)
+
+            if profile_info is None:
+                raise HTTPException(status_code=404, detail="找不到使用者個人檔案")
+
+            _cache_set(cache_key, profile_info)
+
+        # 個人檔案來自 Instagram，與貼文表的資料版本無關；
+        # ETag 直接以回應內容計算，檔案變了驗證器才會變
+        etag = hashlib.blake2b(
+            json.dumps(profile_info.to_dict(), sort_keys=True).encode(),
+            digest_size=8
+        ).hexdigest()
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        response.headers["ETag"] = etag
         return profile_info
-        
+
+
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"獲取個人檔案時發生錯誤: {e}")
+        logger.error("獲取個人檔案時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"獲取個人檔案時發生錯誤: {str(e)}")
 
 @app.post("/extract/{username}")
-async def extract_posts(username: str, background_tasks: BackgroundTasks):
+async def extract_posts(username: str):
     """提取儲存貼文（背景執行）"""
     try:
         extractor = get_extractor(username)
@@ -210,17 +444,10 @@ async def extract_posts(username: str, background_tasks: BackgroundTasks):
         if not extractor.auth_manager.is_logged_in:
             raise HTTPException(status_code=401, detail="尚未登入")
         
-        # 提取所有儲存的貼文（無數量限制）
-        
-        # 在背景執行提取
-        def extract_task():
-            try:
-                result = extractor.extract_saved_posts()
-                logger.info(f"提取完成: {result.to_dict()}")
-            except Exception as e:
-                logger.error(f"背景提取失敗: {e}")
-        
-        background_tasks.add_task(extract_task)
+        # 提取所有儲存的貼文（無數量限制），排入佇列由 process pool 執行
+        await app.state.extract_queue.put(
+            (username, extractor.db_manager.database_file)
+        )
         
         return {
             "success": True,
@@ -232,7 +459,7 @@ async def extract_posts(username: str, background_tasks: BackgroundTasks):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"啟動提取時發生錯誤: {e}")
+        logger.error("啟動提取時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"啟動提取時發生錯誤: {str(e)}")
 
 @app.post("/extract-sync/{username}")
@@ -247,26 +474,90 @@ async def extract_posts_sync(username: str) -> ExtractResult:
         # 提取所有儲存的貼文（無數量限制）
         
         # 同步執行提取
-        result = extractor.extract_saved_posts()
+        result = await asyncio.to_thread(extractor.extract_saved_posts)
         
+        _cache_invalidate(username)
         return result
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"提取時發生錯誤: {e}")
+        logger.error("提取時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"提取時發生錯誤: {str(e)}")
 
 @app.get("/posts/{username}")
-async def get_posts(username: str, limit: Optional[int] = 100, offset: int = 0) -> List[PostData]:
-    """獲取貼文列表"""
+async def get_posts(username: str, request: Request, response: Response,
+                    limit: Optional[int] = 100, offset: int = 0,
+                    cursor: Optional[str] = None, stream: bool = False):
+    """獲取貼文列表
+
+    建議以 cursor 做 keyset 分頁；offset 分頁保留向後相容，
+    但深頁數時資料庫需掃過並丟棄前面所有列。
+    未帶 cursor 的第一頁維持原本的列表回應，下一頁游標放在
+    X-Next-Cursor 回應標頭，取得後以 cursor 參數續翻（回應改為
+    {"posts": [...], "next_cursor": ...} 形式）；游標是不透明字串，
+    用戶端不應自行組裝。
+    stream=true 時以 NDJSON 串流回應，貼文逐列送出，不先在記憶體組完整份 JSON。
+    """
     try:
+        if offset and cursor is None:
+            logger.warning("offset 分頁已不建議使用，請改用 cursor 參數")
+
+        if stream:
+            cursor_key = _decode_cursor(cursor) if cursor else None
+            extractor = get_extractor(username)
+
+            def _ndjson():
+                for post in extractor.iter_posts_from_db(limit, offset, cursor_key):
+                    yield json.dumps(post.to_dict(), ensure_ascii=False) + "\n"
+
+            return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
         extractor = get_extractor(username)
-        posts = extractor.get_posts_from_db(limit=limit, offset=offset)
-        return posts
-        
+
+        etag = await _current_etag(extractor)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        response.headers["ETag"] = etag
+
+        # 快取鍵含資料版本（ETag）：版本變動後舊 entry 自然失效，
+        # 不會把過期的快取內容配上現行的 ETag 送出
+        cache_key = f"posts:{username}:{etag}:{limit}:{offset}:{cursor}"
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            if cursor is None:
+                posts, next_cursor = cached
+                if next_cursor:
+                    response.headers["X-Next-Cursor"] = next_cursor
+                return posts
+            return cached
+
+        cursor_key = _decode_cursor(cursor) if cursor else None
+        posts = await asyncio.to_thread(
+            extractor.get_posts_from_db, limit, offset, cursor_key
+        )
+
+        next_cursor = None
+        if limit and len(posts) == limit:
+            last = posts[-1]
+            next_cursor = _encode_cursor(last.post_date, last.post_id)
+
+        if cursor is None:
+            # 向後相容：未帶 cursor 時維持原本的列表回應，
+            # 下一頁游標改由 X-Next-Cursor 標頭提供，第一頁就能啟動 keyset 分頁
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
+            _cache_set(cache_key, (posts, next_cursor))
+            return posts
+
+        result = {"posts": posts, "next_cursor": next_cursor}
+        _cache_set(cache_key, result)
+        return result
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"獲取貼文時發生錯誤: {e}")
+        logger.error("獲取貼文時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"獲取貼文時發生錯誤: {str(e)}")
 
 @app.post("/search/{username}")
@@ -274,20 +565,31 @@ async def search_posts(username: str, request: SearchRequest) -> List[PostData]:
     """搜尋貼文"""
     try:
         extractor = get_extractor(username)
-        posts = extractor.search_posts(request.keyword, request.limit)
+        posts = await asyncio.to_thread(extractor.search_posts, request.keyword, request.limit)
         return posts
         
     except Exception as e:
-        logger.error(f"搜尋貼文時發生錯誤: {e}")
+        logger.error("搜尋貼文時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"搜尋貼文時發生錯誤: {str(e)}")
 
 @app.get("/status/{username}")
-async def get_status(username: str):
+async def get_status(username: str, request: Request, response: Response):
     """獲取提取器狀態"""
     try:
         extractor = get_extractor(username)
-        
-        posts_count = extractor.get_posts_count()
+
+        etag = await _current_etag(extractor)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        response.headers["ETag"] = etag
+
+        # 快取鍵含資料版本（ETag），避免舊內容配上現行 ETag
+        cache_key = f"status:{username}:{etag}"
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+
+        posts_count = await asyncio.to_thread(extractor.get_posts_count)
         is_logged_in = extractor.auth_manager.is_logged_in
         
         status = {
@@ -297,20 +599,20 @@ async def get_status(username: str):
             "database_file": extractor.db_manager.database_file,
         }
         
+        _cache_set(cache_key, status)
         return status
         
     except Exception as e:
-        logger.error(f"獲取狀態時發生錯誤: {e}")
+        logger.error("獲取狀態時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"獲取狀態時發生錯誤: {str(e)}")
 
 @app.delete("/logout/{username}")
 async def logout(username: str):
     """登出並清理資源"""
     try:
-        if username in extractor_instances:
-            extractor = extractor_instances[username]
+        extractor = extractor_cache.pop(username)
+        if extractor is not None:
             extractor.close()
-            del extractor_instances[username]
         
         return {
             "success": True,
@@ -318,7 +620,7 @@ async def logout(username: str):
         }
         
     except Exception as e:
-        logger.error(f"登出時發生錯誤: {e}")
+        logger.error("登出時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"登出時發生錯誤: {str(e)}")
 
 @app.patch("/posts/update-metadata/{username}")
@@ -327,17 +629,12 @@ async def update_post_metadata(username: str, request: BatchUpdatePostRequest):
     try:
         extractor = get_extractor(username)
         
-        # 轉換 Pydantic 模型為字典列表
-        updates = []
-        for update in request.updates:
-            updates.append({
-                "post_id": update.post_id,
-                "parsed_store": update.parsed_store,
-                "parsed_address": update.parsed_address
-            })
-        
+        # 轉換 Pydantic 模型為字典列表（欄位名稱與資料庫層一致，直接 dump）
+        updates = [update.model_dump() for update in request.updates]
+
         # 執行批次更新
-        result = extractor.batch_update_post_metadata(updates)
+        result = await asyncio.to_thread(extractor.batch_update_post_metadata, updates)
+        _cache_invalidate(username)
         
         if result["success_count"] > 0:
             return {
@@ -359,47 +656,79 @@ async def update_post_metadata(username: str, request: BatchUpdatePostRequest):
             }
             
     except Exception as e:
-        logger.error(f"批次更新貼文元數據時發生錯誤: {e}")
+        logger.error("批次更新貼文元數據時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"批次更新貼文元數據時發生錯誤: {str(e)}")
 
 @app.get("/posts/unparsed/{username}")
-async def get_unparsed_posts(username: str, limit: Optional[int] = 100, offset: int = 0):
+async def get_unparsed_posts(username: str, limit: Optional[int] = 100, offset: int = 0,
+                             cursor: Optional[str] = None):
     """獲取尚未解析店家和地址的貼文（只返回 post_id 和 content）"""
     try:
+        if offset and cursor is None:
+            logger.warning("offset 分頁已不建議使用，請改用 cursor 參數")
+
+        cursor_key = _decode_cursor(cursor) if cursor else None
+
         extractor = get_extractor(username)
         
-        unparsed_posts = extractor.get_unparsed_posts(limit=limit, offset=offset)
+        unparsed_posts = await asyncio.to_thread(
+            extractor.get_unparsed_posts, limit, offset, cursor_key
+        )
         
+        next_cursor = None
+        if limit and len(unparsed_posts) == limit:
+            last = unparsed_posts[-1]
+            next_cursor = _encode_cursor(last["post_date"], last["post_id"])
+
         return {
             "success": True,
             "count": len(unparsed_posts),
             "posts": unparsed_posts,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "next_cursor": next_cursor
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"獲取未解析貼文時發生錯誤: {e}")
+        logger.error("獲取未解析貼文時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"獲取未解析貼文時發生錯誤: {str(e)}")
 
 @app.get("/posts/parsed/{username}")
-async def get_parsed_posts(username: str, limit: Optional[int] = 100, offset: int = 0):
+async def get_parsed_posts(username: str, limit: Optional[int] = 100, offset: int = 0,
+                           cursor: Optional[str] = None):
     """獲取已解析且地址不為空的貼文（返回 post_id, parsed_store, parsed_address）"""
     try:
+        if offset and cursor is None:
+            logger.warning("offset 分頁已不建議使用，請改用 cursor 參數")
+
+        cursor_key = _decode_cursor(cursor) if cursor else None
+
         extractor = get_extractor(username)
         
-        parsed_posts = extractor.get_parsed_posts(limit=limit, offset=offset)
+        parsed_posts = await asyncio.to_thread(
+            extractor.get_parsed_posts, limit, offset, cursor_key
+        )
         
+        next_cursor = None
+        if limit and len(parsed_posts) == limit:
+            last = parsed_posts[-1]
+            next_cursor = _encode_cursor(last["updated_at"], last["post_id"])
+
         return {
             "success": True,
             "count": len(parsed_posts),
             "posts": parsed_posts,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "next_cursor": next_cursor
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"獲取已解析貼文時發生錯誤: {e}")
+        logger.error("獲取已解析貼文時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"獲取已解析貼文時發生錯誤: {str(e)}")
 
 @app.delete("/posts/{username}")
@@ -408,10 +737,12 @@ async def delete_post(username: str, request: DeletePostRequest):
     try:
         extractor = get_extractor(username)
         
-        success = extractor.delete_post_by_id(
-            post_id=request.post_id,
-            unsave_from_instagram=request.unsave_from_instagram
+        success = await asyncio.to_thread(
+            extractor.delete_post_by_id,
+            request.post_id,
+            request.unsave_from_instagram
         )
+        _cache_invalidate(username)
         
         if success:
             message = f"成功從資料庫刪除貼文 {request.post_id}"
@@ -431,7 +762,7 @@ async def delete_post(username: str, request: DeletePostRequest):
             raise HTTPException(status_code=404, detail=f"找不到貼文 ID: {request.post_id}")
         
     except Exception as e:
-        logger.error(f"刪除貼文時發生錯誤: {e}")
+        logger.error("刪除貼文時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"刪除貼文時發生錯誤: {str(e)}")
 
 @app.delete("/posts/batch/{username}")
@@ -440,10 +771,12 @@ async def batch_delete_posts(username: str, request: BatchDeletePostRequest):
     try:
         extractor = get_extractor(username)
         
-        results = extractor.batch_delete_posts(
-            post_ids=request.post_ids,
-            unsave_from_instagram=request.unsave_from_instagram
+        results = await asyncio.to_thread(
+            extractor.batch_delete_posts,
+            request.post_ids,
+            request.unsave_from_instagram
         )
+        _cache_invalidate(username)
         
         message = f"批次操作完成: 從資料庫刪除成功 {results['success_count']} 篇，失敗 {results['failed_count']} 篇"
         instagram_note = ""
@@ -460,13 +793,13 @@ async def batch_delete_posts(username: str, request: BatchDeletePostRequest):
         }
         
     except Exception as e:
-        logger.error(f"批次刪除貼文時發生錯誤: {e}")
+        logger.error("批次刪除貼文時發生錯誤: %s", e)
         raise HTTPException(status_code=500, detail=f"批次刪除貼文時發生錯誤: {str(e)}")
 
 # 錯誤處理
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
-    logger.error(f"未處理的錯誤: {exc}")
+    logger.error("未處理的錯誤: %s", exc)
     return JSONResponse(
         status_code=500,
         content={"detail": "內部伺服器錯誤"}
@@ -11,4 +11,19 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from config.settings import Config
 
 if __name__ == "__main__":
-    uvicorn.run("api.app:app", host="0.0.0.0", port=8080, reload=True)
+    # DEV=1 時啟用自動重載（單 worker），正式環境不付重載監看的成本
+    dev_mode = os.getenv("DEV") == "1"
+    # 預設 2n+1 個 worker，避免單一耗時的提取請求卡住其他請求
+    workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+    uvicorn.run(
+        "api.app:app",
+        host=Config.API_HOST,
+        port=8080,
+        loop="uvloop",
+        http="httptools",
+        reload=dev_mode,
+        workers=1 if dev_mode else workers,
+        log_level=Config.LOG_LEVEL,
+        # access log 是高流量下的熱路徑，關閉以節省每個請求的格式化成本
+        access_log=False,
+    )
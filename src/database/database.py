@@ -4,338 +4,794 @@
 """
 import sqlite3
 import logging
-from typing import Set, List, Optional
+import threading
+import calendar
+from datetime import datetime, timezone
+from typing import Set, List, Optional, Tuple
 import instaloader
 from ..models.models import PostData
+from .pool import ConnectionPool
+
+
+def _build_default_logger() -> logging.Logger:
+    """建立模組層級的預設日誌記錄器（所有實例共用）"""
+    logger = logging.getLogger(__name__)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    return logger
+
+
+_DEFAULT_LOGGER = _build_default_logger()
+
+
+def _iso_date(value):
+    """把資料庫的 epoch 整數日期轉回 API 使用的 ISO 字串
+
+    尚未轉換的舊資料（文字格式）原樣回傳，維持向後相容。
+    """
+    if isinstance(value, int):
+        return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None).isoformat()
+    return value
+
+
+def _to_epoch(value):
+    """把 cursor/查詢條件中的 ISO 日期字串轉成 epoch 整數綁定值"""
+    if isinstance(value, str):
+        return calendar.timegm(datetime.fromisoformat(value).timetuple())
+    return value
+
+
+def _post_row_factory(cursor, row) -> PostData:
+    """把查詢結果列直接組成 PostData（欄位順序與 SELECT 一致）
+
+    掛在 cursor 上當 row factory，省去每列先建 tuple 再逐欄位
+    命名建構 dataclass 的成本。
+    """
+    return PostData(row[0], row[1], _iso_date(row[2]), *row[3:])
+
+
+def _unparsed_row_factory(cursor, row) -> dict:
+    """未解析貼文查詢的 row factory（post_id, content, post_date）"""
+    return {'post_id': row[0], 'content': row[1], 'post_date': _iso_date(row[2])}
+
+
+def _parsed_row_factory(cursor, row) -> dict:
+    """已解析貼文查詢的 row factory（post_id, parsed_store, parsed_address, updated_at）"""
+    return {
+        'post_id': row[0],
+        'parsed_store': row[1],
+        'parsed_address': row[2],
+        'updated_at': row[3],
+    }
 
 
 class DatabaseManager:
     """資料庫管理器"""
-    
+
+    # update_post_metadata 與批次更新共用的單一靜態語句：
+    # COALESCE(?, 原值) 讓 None 代表「維持不變」，所有欄位組合都走
+    # 同一句可快取的 prepared statement
+    _UPDATE_METADATA_SQL = (
+        'UPDATE posts SET parsed_store = COALESCE(?, parsed_store), '
+        'parsed_address = COALESCE(?, parsed_address), '
+        'updated_at = CURRENT_TIMESTAMP WHERE post_id = ?'
+    )
+
     def __init__(self, database_file: str, logger: Optional[logging.Logger] = None):
         """
         初始化資料庫管理器
-        
+
         Args:
             database_file: 資料庫檔案路徑
             logger: 日誌記錄器
         """
         self.database_file = database_file
-        self.logger = logger or self._setup_default_logger()
+        self.logger = logger or _DEFAULT_LOGGER
+        self.pool = ConnectionPool(database_file, logger=self.logger)
+        # WAL 模式同一時間只允許一個寫入者；先在應用層序列化，
+        # 避免多執行緒搶寫時互撞 SQLITE_BUSY
+        self._write_lock = threading.Lock()
         self._processed_ids_cache: Optional[Set[str]] = None
-    
-    def _setup_default_logger(self) -> logging.Logger:
-        """設定預設日誌記錄器"""
-        logger = logging.getLogger(__name__)
-        if not logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter('[%(levelname)s] %(message)s')
-            handler.setFormatter(formatter)
-            logger.addHandler(handler)
-            logger.setLevel(logging.INFO)
-        return logger
-    
+
     def init_database(self) -> bool:
         """初始化資料庫，建立 posts 表並確保包含所有必要欄位"""
         try:
-            conn = sqlite3.connect(self.database_file)
-            cursor = conn.cursor()
-            
-            # 檢查是否已有 posts 表
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='posts'")
-            if cursor.fetchone():
-                # 檢查是否需要添加新欄位
-                cursor.execute("PRAGMA table_info(posts)")
-                columns = [column[1] for column in cursor.fetchall()]
-                
-                # 如果沒有 parsed_store 欄位，添加它
-                if 'parsed_store' not in columns:
-                    cursor.execute('ALTER TABLE posts ADD COLUMN parsed_store TEXT')
-                    self.logger.info("已添加 parsed_store 欄位")
-                
-                # 如果沒有 parsed_address 欄位，添加它
-                if 'parsed_address' not in columns:
-                    cursor.execute('ALTER TABLE posts ADD COLUMN parsed_address TEXT')
-                    self.logger.info("已添加 parsed_address 欄位")
-                
-                self.logger.info(f"使用現有資料庫: {self.database_file}")
-            else:
-                # 建立包含所有欄位的新表
+            with self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+
+                # 檢查是否已有 posts 表
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='posts'")
+                if cursor.fetchone():
+                    # 檢查是否需要添加新欄位
+                    cursor.execute("PRAGMA table_info(posts)")
+                    columns = [column[1] for column in cursor.fetchall()]
+
+                    # 如果沒有 parsed_store 欄位，添加它
+                    if 'parsed_store' not in columns:
+                        cursor.execute('ALTER TABLE posts ADD COLUMN parsed_store TEXT')
+                        self.logger.info("已添加 parsed_store 欄位")
+
+                    # 如果沒有 parsed_address 欄位，添加它
+                    if 'parsed_address' not in columns:
+                        cursor.execute('ALTER TABLE posts ADD COLUMN parsed_address TEXT')
+                        self.logger.info("已添加 parsed_address 欄位")
+
+                    self.logger.info(f"使用現有資料庫: {self.database_file}")
+                else:
+                    # 建立包含所有欄位的新表
+                    cursor.execute('''
+                        CREATE TABLE posts (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            post_id TEXT UNIQUE NOT NULL,
+                            author TEXT NOT NULL,
+                            post_date DATETIME NOT NULL,
+                            post_type TEXT NOT NULL,
+                            likes INTEGER DEFAULT 0,
+                            comments INTEGER DEFAULT 0,
+                            url TEXT NOT NULL,
+                            content TEXT NOT NULL,
+                            parsed_store TEXT,
+                            parsed_address TEXT,
+                            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                        )
+                    ''')
+
+                    self.logger.info(f"新資料庫已建立: {self.database_file}")
+
+                # 舊資料的文字日期轉成 epoch 整數（冪等，只影響 text 列）
+                # 固定 8 位元組的整數鍵讓日期索引更小、比較更快
                 cursor.execute('''
-                    CREATE TABLE posts (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        post_id TEXT UNIQUE NOT NULL,
-                        author TEXT NOT NULL,
-                        post_date DATETIME NOT NULL,
-                        post_type TEXT NOT NULL,
-                        likes INTEGER DEFAULT 0,
-                        comments INTEGER DEFAULT 0,
-                        url TEXT NOT NULL,
-                        content TEXT NOT NULL,
-                        parsed_store TEXT,
-                        parsed_address TEXT,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
+                    UPDATE posts SET post_date = CAST(strftime('%s', post_date) AS INTEGER)
+                    WHERE typeof(post_date) = 'text'
                 ''')
-                
-                # 建立索引
-                cursor.execute('CREATE INDEX idx_posts_author ON posts(author)')
-                cursor.execute('CREATE INDEX idx_posts_date ON posts(post_date)')
-                cursor.execute('CREATE INDEX idx_posts_type ON posts(post_type)')
-                cursor.execute('CREATE INDEX idx_posts_parsed_store ON posts(parsed_store)')
-                cursor.execute('CREATE INDEX idx_posts_parsed_address ON posts(parsed_address)')
-                
-                self.logger.info(f"新資料庫已建立: {self.database_file}")
-            
-            conn.commit()
-            conn.close()
+
+                # 建立全文檢索表與同步觸發器
+                self._ensure_fts(cursor)
+
+                # 建立貼文數量快取表與維護觸發器
+                self._ensure_count_meta(cursor)
+
+                # 建立提取進度檢查點表
+                self._ensure_sync_state(cursor)
+
+                # 建立作者統計表與維護觸發器
+                self._ensure_author_stats(cursor)
+
+                # 查詢用的次要索引
+                self._ensure_indexes(cursor)
+
             return True
         except Exception as e:
             self.logger.error(f"資料庫初始化失敗: {e}")
             return False
-    
+
+    def _ensure_indexes(self, cursor: sqlite3.Cursor):
+        """建立查詢用的次要索引（冪等），批次匯入後重建也走這裡"""
+        # 早期的單欄索引已被複合索引涵蓋（author、post_date），
+        # post_type 則沒有任何查詢使用；移除以降低每列插入的維護成本
+        cursor.execute('DROP INDEX IF EXISTS idx_posts_author')
+        cursor.execute('DROP INDEX IF EXISTS idx_posts_date')
+        cursor.execute('DROP INDEX IF EXISTS idx_posts_type')
+
+        # keyset 分頁用的複合索引
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_posts_date_id '
+            'ON posts(post_date DESC, post_id DESC)'
+        )
+
+        # 讓 MAX(updated_at)（ETag 版本計算）成為索引 seek
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_posts_updated '
+            'ON posts(updated_at)'
+        )
+
+        # 依作者查詢時直接以索引順序輸出最新貼文，免去 filesort
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_posts_author_date '
+            'ON posts(author, post_date DESC)'
+        )
+
+        # 局部索引：未解析/已解析貼文查詢只需掃描符合條件的列，
+        # 索引鍵對齊各查詢的 ORDER BY，輸出即為排序後結果。
+        # 單欄的 parsed_store/parsed_address 全表索引已被局部索引取代
+        cursor.execute('DROP INDEX IF EXISTS idx_posts_parsed_store')
+        cursor.execute('DROP INDEX IF EXISTS idx_posts_parsed_address')
+
+        # 未解析查詢連 content 一起放進索引（covering），
+        # 整個查詢只走索引、不回主表取列；舊版定義先移除
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type='index' AND name='idx_posts_unparsed'")
+        row = cursor.fetchone()
+        if row and 'content' not in (row[0] or ''):
+            cursor.execute('DROP INDEX idx_posts_unparsed')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_posts_unparsed
+            ON posts(post_date DESC, post_id DESC, content)
+            WHERE (parsed_store IS NULL OR parsed_store = '')
+              AND parsed_address IS NULL
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_posts_parsed
+            ON posts(updated_at DESC, post_id DESC)
+            WHERE parsed_address IS NOT NULL AND parsed_address != ''
+        ''')
+
+    def drop_secondary_indexes(self) -> bool:
+        """卸下所有次要索引，供大量匯入前呼叫
+
+        對已建索引的表逐列插入，每列都要平衡一次 B-tree；
+        匯入完成後呼叫 rebuild_secondary_indexes 以一次排序掃描重建。
+        只影響 idx_posts_* 索引，post_id 的 UNIQUE 約束與觸發器維持不動。
+        """
+        try:
+            with self._write_lock, self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type='index' "
+                    "AND tbl_name='posts' AND name LIKE 'idx_posts_%'"
+                )
+                names = [row[0] for row in cursor.fetchall()]
+                for name in names:
+                    cursor.execute(f'DROP INDEX {name}')
+            self.logger.info(f"已卸下 {len(names)} 個次要索引（批次匯入模式）")
+            return True
+        except Exception as e:
+            self.logger.error(f"卸下次要索引失敗: {e}")
+            return False
+
+    def rebuild_secondary_indexes(self) -> bool:
+        """重建次要索引，供大量匯入後呼叫"""
+        try:
+            with self._write_lock, self.pool.get_connection() as conn:
+                self._ensure_indexes(conn.cursor())
+            self.logger.info("次要索引已重建")
+            return True
+        except Exception as e:
+            self.logger.error(f"重建次要索引失敗: {e}")
+            return False
+
+    def _ensure_fts(self, cursor: sqlite3.Cursor):
+        """建立 posts_fts 全文檢索表（external content 模式）與同步觸發器
+
+        第一次建表時自動從既有 posts 回填索引內容，
+        舊資料庫升級後不需要手動呼叫 rebuild_fts 就能搜尋。
+        """
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='posts_fts'"
+        )
+        fts_exists = cursor.fetchone() is not None
+
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+                content, author, parsed_store, parsed_address,
+                content='posts', content_rowid='id',
+                tokenize='trigram'
+            )
+        ''')
+
+        if not fts_exists:
+            cursor.execute("SELECT EXISTS(SELECT 1 FROM posts)")
+            if cursor.fetchone()[0]:
+                cursor.execute("INSERT INTO posts_fts(posts_fts) VALUES('rebuild')")
+                self.logger.info("已從既有貼文回填 posts_fts 索引")
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+                INSERT INTO posts_fts(rowid, content, author, parsed_store, parsed_address)
+                VALUES (new.id, new.content, new.author, new.parsed_store, new.parsed_address);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+                INSERT INTO posts_fts(posts_fts, rowid, content, author, parsed_store, parsed_address)
+                VALUES ('delete', old.id, old.content, old.author, old.parsed_store, old.parsed_address);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE ON posts BEGIN
+                INSERT INTO posts_fts(posts_fts, rowid, content, author, parsed_store, parsed_address)
+                VALUES ('delete', old.id, old.content, old.author, old.parsed_store, old.parsed_address);
+                INSERT INTO posts_fts(rowid, content, author, parsed_store, parsed_address)
+                VALUES (new.id, new.content, new.author, new.parsed_store, new.parsed_address);
+            END
+        ''')
+
+    def _ensure_author_stats(self, cursor: sqlite3.Cursor):
+        """建立由觸發器維護的作者統計表
+
+        把 GROUP BY author 的彙總成本移到寫入時攤提，
+        讀取端只需掃這張小表。
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS author_stats (
+                author TEXT PRIMARY KEY,
+                post_count INTEGER NOT NULL DEFAULT 0,
+                total_likes INTEGER NOT NULL DEFAULT 0,
+                latest_post DATETIME
+            )
+        ''')
+        # 首次建立時從既有資料回填
+        cursor.execute('SELECT EXISTS(SELECT 1 FROM author_stats)')
+        if not cursor.fetchone()[0]:
+            cursor.execute('''
+                INSERT INTO author_stats (author, post_count, total_likes, latest_post)
+                SELECT author, COUNT(*), COALESCE(SUM(likes), 0), MAX(post_date)
+                FROM posts GROUP BY author
+            ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS author_stats_ai AFTER INSERT ON posts BEGIN
+                INSERT INTO author_stats (author, post_count, total_likes, latest_post)
+                VALUES (new.author, 1, new.likes, new.post_date)
+                ON CONFLICT(author) DO UPDATE SET
+                    post_count = post_count + 1,
+                    total_likes = total_likes + new.likes,
+                    latest_post = MAX(latest_post, new.post_date);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS author_stats_ad AFTER DELETE ON posts BEGIN
+                UPDATE author_stats SET
+                    post_count = post_count - 1,
+                    total_likes = total_likes - old.likes
+                WHERE author = old.author;
+                DELETE FROM author_stats WHERE author = old.author AND post_count <= 0;
+            END
+        ''')
+        # 與 posts.post_date 同步改存 epoch 整數
+        cursor.execute('''
+            UPDATE author_stats SET latest_post = CAST(strftime('%s', latest_post) AS INTEGER)
+            WHERE typeof(latest_post) = 'text'
+        ''')
+
+    def get_author_statistics(self) -> List[dict]:
+        """取得各作者的貼文統計（由 author_stats 表直接讀出）"""
+        try:
+            with self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT author, post_count, total_likes,
+                           total_likes * 1.0 / post_count AS avg_likes,
+                           latest_post
+                    FROM author_stats
+                    ORDER BY post_count DESC
+                ''')
+                return [
+                    {
+                        'author': row[0],
+                        'post_count': row[1],
+                        'total_likes': row[2],
+                        'avg_likes': row[3],
+                        'latest_post': _iso_date(row[4]),
+                    }
+                    for row in cursor
+                ]
+        except Exception as e:
+            self.logger.error(f"取得作者統計失敗: {e}")
+            return []
+
+    def rebuild_fts(self) -> bool:
+        """重建 posts_fts 索引內容
+
+        觸發器只維護建表之後的變更；既有資料庫第一次啟用全文檢索、
+        或懷疑索引與 posts 不同步時，呼叫這個一次性工具重灌。
+        """
+        try:
+            with self.pool.get_connection() as conn:
+                conn.execute("INSERT INTO posts_fts(posts_fts) VALUES('rebuild')")
+            self.logger.info("posts_fts 索引重建完成")
+            return True
+        except Exception as e:
+            self.logger.error(f"重建 posts_fts 失敗: {e}")
+            return False
+
+    def _ensure_count_meta(self, cursor: sqlite3.Cursor):
+        """建立由觸發器維護的貼文數量表，讓 get_posts_count 變成 O(1) 查詢"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS posts_meta (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                cnt INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute(
+            'INSERT OR IGNORE INTO posts_meta(id, cnt) '
+            'VALUES (0, (SELECT COUNT(*) FROM posts))'
+        )
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS posts_meta_ai AFTER INSERT ON posts BEGIN
+                UPDATE posts_meta SET cnt = cnt + 1 WHERE id = 0;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS posts_meta_ad AFTER DELETE ON posts BEGIN
+                UPDATE posts_meta SET cnt = cnt - 1 WHERE id = 0;
+            END
+        ''')
+
+    def _ensure_sync_state(self, cursor: sqlite3.Cursor):
+        """建立提取進度檢查點表（單列），記錄上次同步看到的最新貼文"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_shortcode TEXT,
+                last_sync_ts DATETIME
+            )
+        ''')
+
+    def get_sync_checkpoint(self) -> Optional[str]:
+        """取得上次提取完成時串流最前端的貼文 shortcode，沒有記錄時回傳 None"""
+        try:
+            with self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT last_shortcode FROM sync_state WHERE id = 1')
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            self.logger.error(f"讀取同步檢查點失敗: {e}")
+            return None
+
+    def set_sync_checkpoint(self, shortcode: str) -> bool:
+        """記錄本次提取看到的最新 shortcode，供下次提取早停"""
+        try:
+            with self._write_lock, self.pool.get_connection() as conn:
+                conn.execute('''
+                    INSERT INTO sync_state (id, last_shortcode, last_sync_ts)
+                    VALUES (1, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(id) DO UPDATE SET
+                        last_shortcode = excluded.last_shortcode,
+                        last_sync_ts = excluded.last_sync_ts
+                ''', (shortcode,))
+            return True
+        except Exception as e:
+            self.logger.error(f"寫入同步檢查點失敗: {e}")
+            return False
+
+    def get_data_version(self) -> str:
+        """回傳代表資料目前狀態的版本字串（筆數 + 最後更新時間）
+
+        供 API 層產生 ETag 使用；兩個子查詢都走索引/單列查找，成本固定。
+        """
+        try:
+            with self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT (SELECT cnt FROM posts_meta WHERE id = 0),
+                           (SELECT MAX(updated_at) FROM posts)
+                ''')
+                row = cursor.fetchone()
+            return f"{row[0]}:{row[1]}"
+        except Exception as e:
+            self.logger.error(f"取得資料版本失敗: {e}")
+            return "unknown"
+
     def get_all_processed_ids(self) -> Set[str]:
         """一次性載入所有已處理的貼文 ID，回傳 set 用於快速查找"""
         if self._processed_ids_cache is not None:
             return self._processed_ids_cache
-            
+
         try:
-            conn = sqlite3.connect(self.database_file)
-            cursor = conn.cursor()
-            cursor.execute('SELECT post_id FROM posts')
-            processed_ids = {row[0] for row in cursor.fetchall()}
-            conn.close()
-            
+            with self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.arraysize = 5000
+                cursor.execute('SELECT post_id FROM posts')
+                # 直接迭代 cursor 串流建 set，免去 fetchall 的整串 tuple 列表
+                processed_ids = {row[0] for row in cursor}
+
             self._processed_ids_cache = processed_ids
             self.logger.info(f"載入了 {len(processed_ids)} 個已處理貼文 ID 到記憶體")
             return processed_ids
         except Exception as e:
             self.logger.error(f"載入已處理 ID 失敗: {e}")
             return set()
-    
+
+    def is_processed(self, post_id: str) -> bool:
+        """檢查單篇貼文是否已存在
+
+        走 post_id 的 UNIQUE 索引做點查，O(1) 記憶體；零星檢查用這個，
+        大量迴圈仍建議先以 get_all_processed_ids 載入 set。
+        """
+        if self._processed_ids_cache is not None:
+            return post_id in self._processed_ids_cache
+        try:
+            with self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT 1 FROM posts WHERE post_id = ? LIMIT 1', (post_id,)
+                )
+                return cursor.fetchone() is not None
+        except Exception as e:
+            self.logger.error(f"檢查貼文是否存在失敗: {e}")
+            return False
+
     def save_post(self, post: instaloader.Post) -> bool:
-        """將貼文資料儲存到資料庫"""
+        """將貼文資料儲存到資料庫，重複的貼文回傳 False"""
         try:
-            conn = sqlite3.connect(self.database_file)
-            cursor = conn.cursor()
-            
-            # 插入貼文資料
-            cursor.execute('''
-                INSERT INTO posts (post_id, author, post_date, post_type, likes, comments, url, content)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            with self._write_lock, self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+
+                # OR IGNORE 讓引擎自行跳過重複的 post_id；RETURNING 直接
+                # 回報是否真的插入，不必靠例外或 rowcount 判斷
+                cursor.execute('''
+                    INSERT OR IGNORE INTO posts (post_id, author, post_date, post_type, likes, comments, url, content)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    RETURNING post_id
+                ''', (
+                    post.shortcode,
+                    post.owner_username,
+                    calendar.timegm(post.date_utc.timetuple()),
+                    '影片' if post.is_video else '圖片',
+                    post.likes,
+                    post.comments,
+                    f"https://www.instagram.com/p/{post.shortcode}/",
+                    post.caption or ""
+                ))
+                inserted = cursor.fetchone() is not None
+
+            # 更新快取
+            if inserted and self._processed_ids_cache is not None:
+                self._processed_ids_cache.add(post.shortcode)
+
+            return inserted
+
+        except Exception as e:
+            self.logger.error(f"資料庫儲存失敗: {e}")
+            return False
+
+    def save_posts_batch(self, posts: List[instaloader.Post], batch_size: int = 500) -> int:
+        """以單一交易批次儲存多篇貼文，回傳實際新增的筆數
+
+        逐篇 commit 會讓每篇貼文都付一次 fsync；這裡把多篇貼文放進
+        一個 BEGIN/COMMIT，並以 executemany 重用 prepared statement。
+
+        Args:
+            posts: instaloader 貼文列表
+            batch_size: 每次 executemany 的筆數上限
+        """
+        if not posts:
+            return 0
+
+        rows = [
+            (
                 post.shortcode,
                 post.owner_username,
-                post.date_utc.isoformat(),
+                calendar.timegm(post.date_utc.timetuple()),
                 '影片' if post.is_video else '圖片',
                 post.likes,
                 post.comments,
                 f"https://www.instagram.com/p/{post.shortcode}/",
                 post.caption or ""
-            ))
-            
-            conn.commit()
-            conn.close()
-            
-            # 更新快取
+            )
+            for post in posts
+        ]
+
+        try:
+            with self._write_lock, self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+                inserted = 0
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    for i in range(0, len(rows), batch_size):
+                        cursor.executemany('''
+                            INSERT OR IGNORE INTO posts (post_id, author, post_date, post_type, likes, comments, url, content)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ''', rows[i:i + batch_size])
+                        inserted += cursor.rowcount
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+
+            # 重複貼文由 OR IGNORE 靜默略過，這裡只記一筆彙總，
+            # 不在逐列路徑上觸發 logging 的鎖與格式化成本
+            duplicates = len(rows) - inserted
+            if duplicates and self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(f"批次儲存略過 {duplicates} 篇重複貼文")
+
+            # 更新快取（OR IGNORE 之下重複的 shortcode 加入 set 也無害）
             if self._processed_ids_cache is not None:
-                self._processed_ids_cache.add(post.shortcode)
-            
-            return True
-            
-        except sqlite3.IntegrityError:
-            # 貼文已存在
-            return False
+                self._processed_ids_cache.update(row[0] for row in rows)
+
+            return inserted
+
         except Exception as e:
-            self.logger.error(f"資料庫儲存失敗: {e}")
-            return False
-    
+            # 寫入失敗要讓呼叫端知道：吞掉例外會讓提取端誤以為已存檔，
+            # 進而推進同步檢查點、永久跳過這批貼文
+            self.logger.error(f"批次儲存貼文失敗: {e}")
+            raise
+
     def get_posts_count(self) -> int:
         """取得已處理的貼文數量"""
         try:
-            conn = sqlite3.connect(self.database_file)
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM posts')
-            count = cursor.fetchone()[0]
-            conn.close()
-            return count
+            with self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+                # posts_meta 由觸發器維護，避免每次輪詢都做全表 COUNT
+                cursor.execute('SELECT cnt FROM posts_meta WHERE id = 0')
+                row = cursor.fetchone()
+                if row is not None:
+                    return row[0]
+                cursor.execute('SELECT COUNT(*) FROM posts')
+                return cursor.fetchone()[0]
         except Exception as e:
             self.logger.error(f"取得貼文數量失敗: {e}")
             return 0
-    
-    def get_posts(self, limit: Optional[int] = None, offset: int = 0) -> List[PostData]:
-        """從資料庫獲取貼文資料"""
+
+    def get_posts(self, limit: Optional[int] = None, offset: int = 0,
+                  cursor_key: Optional[Tuple[str, str]] = None) -> List[PostData]:
+        """從資料庫獲取貼文資料
+
+        Args:
+            limit: 回傳筆數上限
+            offset: 傳統分頁位移（deprecated，OFFSET 需要掃過並丟棄前面所有列）
+            cursor_key: keyset 分頁游標 (post_date, post_id)，只回傳排序在其之後的貼文
+        """
         try:
-            conn = sqlite3.connect(self.database_file)
-            cursor = conn.cursor()
-            
-            query = '''
-                SELECT post_id, author, post_date, post_type, likes, comments, url, content, created_at, updated_at
-                FROM posts 
-                ORDER BY post_date DESC
-            '''
-            
-            if limit:
-                query += f' LIMIT {limit} OFFSET {offset}'
-            
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            conn.close()
-            
-            posts = []
-            for row in rows:
-                posts.append(PostData(
-                    post_id=row[0],
-                    author=row[1],
-                    post_date=row[2],
-                    post_type=row[3],
-                    likes=row[4],
-                    comments=row[5],
-                    url=row[6],
-                    content=row[7],
-                    created_at=row[8],
-                    updated_at=row[9]
-                ))
-            
-            return posts
-            
+            with self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+
+                query = '''
+                    SELECT post_id, author, post_date, post_type, likes, comments, url, content, created_at, updated_at
+                    FROM posts
+                '''
+                params: list = []
+
+                if cursor_key is not None:
+                    query += ' WHERE (post_date, post_id) < (?, ?)'
+                    params.extend((_to_epoch(cursor_key[0]), cursor_key[1]))
+
+                # LIMIT -1 在 SQLite 代表不限筆數；固定以 ? 綁定，
+                # 讓不同分頁參數共用同一句已快取的 prepared statement
+                query += ' ORDER BY post_date DESC, post_id DESC LIMIT ? OFFSET ?'
+                params.extend((limit if limit else -1, offset))
+
+                cursor.row_factory = _post_row_factory
+                cursor.execute(query, params)
+                return cursor.fetchall()
+
         except Exception as e:
             self.logger.error(f"從資料庫獲取貼文失敗: {e}")
             return []
-    
-    def search_posts(self, keyword: str, limit: Optional[int] = None) -> List[PostData]:
-        """在資料庫中搜尋包含關鍵字的貼文"""
-        try:
-            conn = sqlite3.connect(self.database_file)
+
+    def iter_posts(self, limit: Optional[int] = None, offset: int = 0,
+                   cursor_key: Optional[Tuple[str, str]] = None):
+        """以產生器逐批讀取貼文，避免一次實體化整個結果集
+
+        與 get_posts 相同的查詢條件，但用 fetchmany 分批取回並逐列 yield，
+        供串流回應使用。
+        """
+        with self.pool.get_connection() as conn:
             cursor = conn.cursor()
-            
+
             query = '''
                 SELECT post_id, author, post_date, post_type, likes, comments, url, content, created_at, updated_at
-                FROM posts 
-                WHERE content LIKE ? OR author LIKE ?
-                ORDER BY post_date DESC
+                FROM posts
             '''
-            
-            if limit:
-                query += f' LIMIT {limit}'
-            
-            search_term = f'%{keyword}%'
-            cursor.execute(query, (search_term, search_term))
-            rows = cursor.fetchall()
-            conn.close()
-            
-            posts = []
-            for row in rows:
-                posts.append(PostData(
-                    post_id=row[0],
-                    author=row[1],
-                    post_date=row[2],
-                    post_type=row[3],
-                    likes=row[4],
-                    comments=row[5],
-                    url=row[6],
-                    content=row[7],
-                    created_at=row[8],
-                    updated_at=row[9]
-                ))
-            
-            return posts
-            
+            params: list = []
+
+            if cursor_key is not None:
+                query += ' WHERE (post_date, post_id) < (?, ?)'
+                params.extend((_to_epoch(cursor_key[0]), cursor_key[1]))
+
+            query += ' ORDER BY post_date DESC, post_id DESC LIMIT ? OFFSET ?'
+            params.extend((limit if limit else -1, offset))
+
+            cursor.row_factory = _post_row_factory
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(256)
+                if not rows:
+                    break
+                yield from rows
+
+    def search_posts(self, keyword: str, limit: Optional[int] = None) -> List[PostData]:
+        """在資料庫中搜尋包含關鍵字的貼文"""
+        try:
+            with self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+
+                if len(keyword) >= 3:
+                    # trigram tokenizer 需要至少 3 個字元才能比對子字串
+                    query = '''
+                        SELECT p.post_id, p.author, p.post_date, p.post_type, p.likes, p.comments, p.url, p.content, p.created_at, p.updated_at
+                        FROM posts_fts f
+                        JOIN posts p ON p.id = f.rowid
+                        WHERE posts_fts MATCH ?
+                        ORDER BY bm25(posts_fts)
+                    '''
+                    # 以雙引號包住關鍵字，避免被解讀為 FTS 查詢語法
+                    params = ('"' + keyword.replace('"', '""') + '"',)
+                else:
+                    # 短關鍵字退回 GLOB 掃描：不做大小寫折疊，每列比較更便宜，
+                    # 中繼字元以 [] 包住避免被當成萬用字元
+                    query = '''
+                        SELECT post_id, author, post_date, post_type, likes, comments, url, content, created_at, updated_at
+                        FROM posts
+                        WHERE content GLOB ? OR author GLOB ?
+                        ORDER BY post_date DESC
+                    '''
+                    escaped = ''.join(
+                        f'[{ch}]' if ch in '*?[' else ch for ch in keyword
+                    )
+                    search_term = f'*{escaped}*'
+                    params = (search_term, search_term)
+
+                query += ' LIMIT ?'
+                params += (limit if limit else -1,)
+
+                cursor.row_factory = _post_row_factory
+                cursor.execute(query, params)
+                return cursor.fetchall()
+
         except Exception as e:
             self.logger.error(f"搜尋貼文失敗: {e}")
             return []
-    
+
     def update_post_metadata(self, post_id: str, parsed_store: Optional[str] = None, parsed_address: Optional[str] = None) -> bool:
         """更新貼文的 parsed_store 和 parsed_address 欄位"""
+        if parsed_store is None and parsed_address is None:
+            self.logger.warning("沒有提供要更新的欄位")
+            return False
+
         try:
-            conn = sqlite3.connect(self.database_file)
-            cursor = conn.cursor()
-            
-            # 構建動態 SQL 更新語句
-            update_fields = []
-            params = []
-            
-            if parsed_store is not None:
-                update_fields.append("parsed_store = ?")
-                params.append(parsed_store)
-            
-            if parsed_address is not None:
-                update_fields.append("parsed_address = ?")
-                params.append(parsed_address)
-            
-            if not update_fields:
-                self.logger.warning("沒有提供要更新的欄位")
-                return False
-            
-            # 始終更新 updated_at 欄位
-            update_fields.append("updated_at = CURRENT_TIMESTAMP")
-            params.append(post_id)
-            
-            sql = f"UPDATE posts SET {', '.join(update_fields)} WHERE post_id = ?"
-            
-            cursor.execute(sql, params)
-            rows_affected = cursor.rowcount
-            
-            conn.commit()
-            conn.close()
-            
+            with self._write_lock, self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    self._UPDATE_METADATA_SQL,
+                    (parsed_store, parsed_address, post_id)
+                )
+                rows_affected = cursor.rowcount
+
             if rows_affected > 0:
                 self.logger.info(f"成功更新貼文 {post_id} 的元數據")
                 return True
             else:
                 self.logger.warning(f"找不到貼文 ID: {post_id}")
                 return False
-                
+
         except Exception as e:
             self.logger.error(f"更新貼文元數據失敗: {e}")
             return False
-    
-    def get_unparsed_posts(self, limit: Optional[int] = None, offset: int = 0) -> List[dict]:
-        """獲取尚未解析店家和地址的貼文，只返回 post_id 和 content"""
+
+    def get_unparsed_posts(self, limit: Optional[int] = None, offset: int = 0,
+                           cursor_key: Optional[Tuple[str, str]] = None) -> List[dict]:
+        """獲取尚未解析店家和地址的貼文，返回 post_id、content 和分頁用的 post_date"""
         try:
-            conn = sqlite3.connect(self.database_file)
-            cursor = conn.cursor()
-            
-            # 查詢 parsed_store 和 parsed_address 都為 NULL 的貼文
-            base_query = """
-                SELECT post_id, content 
-                FROM posts 
-                WHERE (parsed_store IS NULL OR parsed_store = '') 
-                  AND parsed_address IS NULL
-                ORDER BY post_date DESC
-            """
-            
-            if limit is not None:
-                query = f"{base_query} LIMIT ? OFFSET ?"
-                cursor.execute(query, (limit, offset))
-            else:
-                query = f"{base_query} OFFSET ?"
-                cursor.execute(query, (offset,))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            # 返回字典格式的結果
-            results = []
-            for row in rows:
-                results.append({
-                    'post_id': row[0],
-                    'content': row[1]
-                })
-            
-            return results
-            
+            with self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+
+                # 查詢 parsed_store 和 parsed_address 都為 NULL 的貼文
+                query = """
+                    SELECT post_id, content, post_date
+                    FROM posts
+                    WHERE (parsed_store IS NULL OR parsed_store = '')
+                      AND parsed_address IS NULL
+                """
+                params: list = []
+
+                if cursor_key is not None:
+                    query += " AND (post_date, post_id) < (?, ?)"
+                    params.extend((_to_epoch(cursor_key[0]), cursor_key[1]))
+
+                query += " ORDER BY post_date DESC, post_id DESC"
+
+                # 固定綁定 LIMIT/OFFSET（-1 代表不限），共用同一句快取語句
+                query += " LIMIT ? OFFSET ?"
+                params.extend((limit if limit is not None else -1, offset))
+
+                cursor.row_factory = _unparsed_row_factory
+                cursor.execute(query, params)
+                return cursor.fetchall()
+
         except Exception as e:
             self.logger.error(f"獲取未解析貼文失敗: {e}")
             return []
-    
+
     def batch_update_post_metadata(self, updates: List[dict]) -> dict:
         """批次更新多個貼文的 parsed_store 和 parsed_address 欄位
-        
+
         Args:
             updates: 包含更新資料的字典列表，每個字典包含 post_id, parsed_store, parsed_address
-            
+
         Returns:
             包含成功、失敗數量和詳細結果的字典
         """
@@ -345,83 +801,70 @@ class DatabaseManager:
             "success_posts": [],
             "failed_posts": []
         }
-        
+
+        # 先過濾無效的更新項目
+        valid_updates = []
+        for update in updates:
+            post_id = update.get("post_id")
+            parsed_store = update.get("parsed_store")
+            parsed_address = update.get("parsed_address")
+
+            if not post_id:
+                results["failed_count"] += 1
+                results["failed_posts"].append({
+                    "post_id": post_id,
+                    "error": "缺少 post_id"
+                })
+                continue
+
+            if parsed_store is None and parsed_address is None:
+                results["failed_count"] += 1
+                results["failed_posts"].append({
+                    "post_id": post_id,
+                    "error": "沒有提供要更新的欄位"
+                })
+                continue
+
+            valid_updates.append((parsed_store, parsed_address, post_id))
+
         try:
-            conn = sqlite3.connect(self.database_file)
-            cursor = conn.cursor()
-            
-            for update in updates:
-                post_id = update.get("post_id")
-                parsed_store = update.get("parsed_store")
-                parsed_address = update.get("parsed_address")
-                
-                if not post_id:
-                    results["failed_count"] += 1
-                    results["failed_posts"].append({
-                        "post_id": post_id,
-                        "error": "缺少 post_id"
-                    })
-                    continue
-                
-                # 構建動態 SQL 更新語句
-                update_fields = []
-                params = []
-                
-                if parsed_store is not None:
-                    update_fields.append("parsed_store = ?")
-                    params.append(parsed_store)
-                
-                if parsed_address is not None:
-                    update_fields.append("parsed_address = ?")
-                    params.append(parsed_address)
-                
-                if not update_fields:
-                    results["failed_count"] += 1
-                    results["failed_posts"].append({
+            with self._write_lock, self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+
+                # 先查出實際存在的貼文，用於回報成功/失敗名單
+                existing = self._select_existing_ids(
+                    cursor, [row[2] for row in valid_updates]
+                )
+
+                rows = [row for row in valid_updates if row[2] in existing]
+
+                # 單一交易內一次 executemany，避免逐筆 commit
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor.executemany(self._UPDATE_METADATA_SQL, rows)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+
+            for parsed_store, parsed_address, post_id in valid_updates:
+                if post_id in existing:
+                    results["success_count"] += 1
+                    results["success_posts"].append({
                         "post_id": post_id,
-                        "error": "沒有提供要更新的欄位"
+                        "parsed_store": parsed_store,
+                        "parsed_address": parsed_address
                     })
-                    continue
-                
-                # 始終更新 updated_at 欄位
-                update_fields.append("updated_at = CURRENT_TIMESTAMP")
-                params.append(post_id)
-                
-                sql = f"UPDATE posts SET {', '.join(update_fields)} WHERE post_id = ?"
-                
-                try:
-                    cursor.execute(sql, params)
-                    rows_affected = cursor.rowcount
-                    
-                    if rows_affected > 0:
-                        results["success_count"] += 1
-                        results["success_posts"].append({
-                            "post_id": post_id,
-                            "parsed_store": parsed_store,
-                            "parsed_address": parsed_address
-                        })
-                        self.logger.info(f"成功更新貼文 {post_id}")
-                    else:
-                        results["failed_count"] += 1
-                        results["failed_posts"].append({
-                            "post_id": post_id,
-                            "error": "找不到該貼文 ID"
-                        })
-                        
-                except Exception as e:
+                else:
                     results["failed_count"] += 1
                     results["failed_posts"].append({
                         "post_id": post_id,
-                        "error": str(e)
+                        "error": "找不到該貼文 ID"
                     })
-                    self.logger.error(f"更新貼文 {post_id} 失敗: {e}")
-            
-            conn.commit()
-            conn.close()
-            
+
             self.logger.info(f"批次更新完成: 成功 {results['success_count']} 篇，失敗 {results['failed_count']} 篇")
             return results
-                
+
         except Exception as e:
             self.logger.error(f"批次更新貼文元數據失敗: {e}")
             return {
@@ -430,80 +873,90 @@ class DatabaseManager:
                 "success_posts": [],
                 "failed_posts": [{"post_id": "批次操作", "error": str(e)}]
             }
-    
-    def get_parsed_posts(self, limit: Optional[int] = None, offset: int = 0) -> List[dict]:
-        """獲取已解析且地址不為空的貼文，返回 post_id, parsed_store, parsed_address"""
+
+    # SQLite 單一語句的綁定變數上限（預設 999，保守取 900）
+    _SQL_VAR_LIMIT = 900
+
+    def _select_existing_ids(self, cursor: sqlite3.Cursor, post_ids: List[str]) -> Set[str]:
+        """查詢指定 post_id 中實際存在於資料庫的部分"""
+        existing: Set[str] = set()
+        for i in range(0, len(post_ids), self._SQL_VAR_LIMIT):
+            chunk = post_ids[i:i + self._SQL_VAR_LIMIT]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(
+                f'SELECT post_id FROM posts WHERE post_id IN ({placeholders})',
+                chunk
+            )
+            existing.update(row[0] for row in cursor.fetchall())
+        return existing
+
+    def get_parsed_posts(self, limit: Optional[int] = None, offset: int = 0,
+                         cursor_key: Optional[Tuple[str, str]] = None) -> List[dict]:
+        """獲取已解析且地址不為空的貼文，返回 post_id, parsed_store, parsed_address, updated_at"""
         try:
-            conn = sqlite3.connect(self.database_file)
-            cursor = conn.cursor()
-            
-            # 查詢 parsed_address 不為 NULL 且不為空字串的貼文
-            base_query = """
-                SELECT post_id, parsed_store, parsed_address 
-                FROM posts 
-                WHERE parsed_address IS NOT NULL AND parsed_address != ''
-                ORDER BY updated_at DESC
-            """
-            
-            if limit is not None:
-                query = f"{base_query} LIMIT ? OFFSET ?"
-                cursor.execute(query, (limit, offset))
-            else:
-                query = f"{base_query} OFFSET ?"
-                cursor.execute(query, (offset,))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            # 返回字典格式的結果
-            results = []
-            for row in rows:
-                results.append({
-                    'post_id': row[0],
-                    'parsed_store': row[1],
-                    'parsed_address': row[2]
-                })
-            
-            return results
-            
+            with self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+
+                # 查詢 parsed_address 不為 NULL 且不為空字串的貼文
+                query = """
+                    SELECT post_id, parsed_store, parsed_address, updated_at
+                    FROM posts
+                    WHERE parsed_address IS NOT NULL AND parsed_address != ''
+                """
+                params: list = []
+
+                if cursor_key is not None:
+                    query += " AND (updated_at, post_id) < (?, ?)"
+                    params.extend(cursor_key)
+
+                query += " ORDER BY updated_at DESC, post_id DESC"
+
+                # 固定綁定 LIMIT/OFFSET（-1 代表不限），共用同一句快取語句
+                query += " LIMIT ? OFFSET ?"
+                params.extend((limit if limit is not None else -1, offset))
+
+                cursor.row_factory = _parsed_row_factory
+                cursor.execute(query, params)
+                return cursor.fetchall()
+
         except Exception as e:
             self.logger.error(f"獲取已解析貼文失敗: {e}")
             return []
-    
+
     def delete_post_by_id(self, post_id: str) -> bool:
         """根據 post_id 刪除貼文"""
         try:
-            conn = sqlite3.connect(self.database_file)
-            cursor = conn.cursor()
-            
-            # 刪除貼文
-            cursor.execute('DELETE FROM posts WHERE post_id = ?', (post_id,))
-            rows_affected = cursor.rowcount
-            
-            conn.commit()
-            conn.close()
-            
-            if rows_affected > 0:
+            with self._write_lock, self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+
+                # RETURNING 直接回報是否真的刪到列
+                cursor.execute(
+                    'DELETE FROM posts WHERE post_id = ? RETURNING post_id',
+                    (post_id,)
+                )
+                deleted = cursor.fetchone() is not None
+
+            if deleted:
                 # 從快取中移除
                 if self._processed_ids_cache is not None:
                     self._processed_ids_cache.discard(post_id)
-                
+
                 self.logger.info(f"成功刪除貼文 {post_id}")
                 return True
             else:
                 self.logger.warning(f"找不到貼文 ID: {post_id}")
                 return False
-                
+
         except Exception as e:
             self.logger.error(f"刪除貼文失敗: {e}")
             return False
-    
+
     def batch_delete_posts(self, post_ids: List[str]) -> dict:
         """批次刪除多個貼文
-        
+
         Args:
             post_ids: 要刪除的貼文 ID 列表
-            
+
         Returns:
             包含成功、失敗數量和詳細結果的字典
         """
@@ -513,54 +966,58 @@ class DatabaseManager:
             "success_posts": [],
             "failed_posts": []
         }
-        
+
+        valid_ids = []
+        for post_id in post_ids:
+            if not post_id:
+                results["failed_count"] += 1
+                results["failed_posts"].append({
+                    "post_id": post_id,
+                    "error": "post_id 為空"
+                })
+                continue
+            valid_ids.append(post_id)
+
         try:
-            conn = sqlite3.connect(self.database_file)
-            cursor = conn.cursor()
-            
-            for post_id in post_ids:
-                if not post_id:
-                    results["failed_count"] += 1
-                    results["failed_posts"].append({
-                        "post_id": post_id,
-                        "error": "post_id 為空"
-                    })
-                    continue
-                
+            with self._write_lock, self.pool.get_connection() as conn:
+                cursor = conn.cursor()
+
+                # RETURNING 一次回報實際刪除的 id，免掉事前的存在性 SELECT
+                deleted_ids: Set[str] = set()
+                cursor.execute("BEGIN IMMEDIATE")
                 try:
-                    cursor.execute('DELETE FROM posts WHERE post_id = ?', (post_id,))
-                    rows_affected = cursor.rowcount
-                    
-                    if rows_affected > 0:
-                        results["success_count"] += 1
-                        results["success_posts"].append(post_id)
-                        
-                        # 從快取中移除
-                        if self._processed_ids_cache is not None:
-                            self._processed_ids_cache.discard(post_id)
-                        
-                        self.logger.info(f"成功刪除貼文 {post_id}")
-                    else:
-                        results["failed_count"] += 1
-                        results["failed_posts"].append({
-                            "post_id": post_id,
-                            "error": "找不到該貼文 ID"
-                        })
-                        
-                except Exception as e:
+                    for i in range(0, len(valid_ids), self._SQL_VAR_LIMIT):
+                        chunk = valid_ids[i:i + self._SQL_VAR_LIMIT]
+                        placeholders = ','.join('?' * len(chunk))
+                        cursor.execute(
+                            f'DELETE FROM posts WHERE post_id IN ({placeholders}) '
+                            'RETURNING post_id',
+                            chunk
+                        )
+                        deleted_ids.update(row[0] for row in cursor)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+
+            for post_id in valid_ids:
+                if post_id in deleted_ids:
+                    results["success_count"] += 1
+                    results["success_posts"].append(post_id)
+
+                    # 從快取中移除
+                    if self._processed_ids_cache is not None:
+                        self._processed_ids_cache.discard(post_id)
+                else:
                     results["failed_count"] += 1
                     results["failed_posts"].append({
                         "post_id": post_id,
-                        "error": str(e)
+                        "error": "找不到該貼文 ID"
                     })
-                    self.logger.error(f"刪除貼文 {post_id} 失敗: {e}")
-            
-            conn.commit()
-            conn.close()
-            
+
             self.logger.info(f"批次刪除完成: 成功 {results['success_count']} 篇，失敗 {results['failed_count']} 篇")
             return results
-                
+
         except Exception as e:
             self.logger.error(f"批次刪除貼文失敗: {e}")
             return {
@@ -570,6 +1027,30 @@ class DatabaseManager:
                 "failed_posts": [{"post_id": "批次操作", "error": str(e)}]
             }
 
+    def analyze(self):
+        """更新查詢規劃器統計（sqlite_stat1）
+
+        大量寫入後呼叫一次，避免規劃器拿著過期統計選錯索引。
+        """
+        try:
+            with self._write_lock, self.pool.get_connection() as conn:
+                conn.execute('ANALYZE')
+        except Exception as e:
+            self.logger.warning(f"ANALYZE 失敗: {e}")
+
     def clear_cache(self):
         """清除快取"""
         self._processed_ids_cache = None
+
+    def close(self):
+        """關閉資料庫：合併 WAL 檔後釋放連線池內所有連線
+
+        不先做 checkpoint 的話，行程結束時 -wal/-shm 檔可能持續變大，
+        下一次開啟資料庫也得先付出回放 WAL 的成本。
+        """
+        try:
+            with self.pool.get_connection() as conn:
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        except Exception as e:
+            self.logger.warning(f"WAL checkpoint 失敗: {e}")
+        self.pool.close_all()
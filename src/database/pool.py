@@ -0,0 +1,95 @@
+"""
+SQLite 連線池模組
+提供可重複使用的資料庫連線，避免每次操作重新 connect 與重跑 PRAGMA
+"""
+import os
+import sqlite3
+import queue
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Optional
+
+# 預設連線數可由環境變數調整（WAL 下讀取可並行，寫入仍由上層序列化）
+DEFAULT_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+
+
+class ConnectionPool:
+    """SQLite 連線池
+
+    以 queue.Queue 保存已開啟的連線，首次取用時才建立連線並套用
+    PRAGMA 設定（WAL、synchronous=NORMAL、cache、mmap），之後重複使用。
+    """
+
+    def __init__(self, database_file: str, max_size: int = DEFAULT_POOL_SIZE,
+                 logger: Optional[logging.Logger] = None):
+        """
+        初始化連線池
+
+        Args:
+            database_file: 資料庫檔案路徑
+            max_size: 連線池最大連線數
+            logger: 日誌記錄器
+        """
+        self.database_file = database_file
+        self.max_size = max_size
+        self.logger = logger or logging.getLogger(__name__)
+        self._pool: queue.Queue = queue.Queue(maxsize=max_size)
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create_connection(self) -> sqlite3.Connection:
+        """建立新連線並套用 PRAGMA 設定"""
+        conn = sqlite3.connect(
+            self.database_file,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256
+        )
+        # WAL 寫入後持久化於資料庫檔案，其餘 PRAGMA 為 per-connection 設定
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+
+    @contextmanager
+    def get_connection(self):
+        """以 context manager 形式取得連線，離開時歸還連線池"""
+        conn: Optional[sqlite3.Connection] = None
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self.max_size:
+                    self._created += 1
+                    conn = self._create_connection()
+            if conn is None:
+                # 已達上限，等待其他使用者歸還
+                conn = self._pool.get()
+
+        try:
+            yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self):
+        """關閉連線池中所有連線"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                # 官方建議關閉前跑 optimize：沒東西可做時幾乎零成本
+                conn.execute("PRAGMA optimize")
+                conn.close()
+            except Exception as e:
+                self.logger.warning(f"關閉連線失敗: {e}")
+        with self._lock:
+            self._created = 0
@@ -8,6 +8,30 @@ import logging
 from typing import Optional
 
 
+def _build_default_logger() -> logging.Logger:
+    """建立模組層級的預設日誌記錄器（所有實例共用）"""
+    logger = logging.getLogger(__name__)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    return logger
+
+
+_DEFAULT_LOGGER = _build_default_logger()
+
+# Instaloader 的固定組態：不下載任何媒體與中繼資料，只抓貼文本體
+_LOADER_DEFAULTS = dict(
+    download_pictures=False,
+    download_videos=False,
+    download_video_thumbnails=False,
+    download_geotags=False,
+    download_comments=False,
+    save_metadata=False,
+)
+
+
 class InstagramAuth:
     """Instagram 認證管理器"""
     
@@ -22,7 +46,7 @@ class InstagramAuth:
         """
         self.username = username
         self.use_saved_session = use_saved_session
-        self.logger = logger or self._setup_default_logger()
+        self.logger = logger or _DEFAULT_LOGGER
         
         # Instagram loader 設定
         self.loader = instaloader.Instaloader()
@@ -30,25 +54,9 @@ class InstagramAuth:
         self._is_logged_in = False
         self._needs_2fa = False  # 追蹤是否需要 2FA 驗證
     
-    def _setup_default_logger(self) -> logging.Logger:
-        """設定預設日誌記錄器"""
-        logger = logging.getLogger(__name__)
-        if not logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter('[%(levelname)s] %(message)s')
-            handler.setFormatter(formatter)
-            logger.addHandler(handler)
-            logger.setLevel(logging.INFO)
-        return logger
-    
     def _configure_loader(self):
-        """配置 Instaloader 設定"""
-        self.loader.download_pictures = False
-        self.loader.download_videos = False
-        self.loader.download_video_thumbnails = False
-        self.loader.download_geotags = False
-        self.loader.download_comments = False
-        self.loader.save_metadata = False
+        """配置 Instaloader 設定（一次 __dict__.update 套用所有欄位）"""
+        self.loader.__dict__.update(_LOADER_DEFAULTS)
     
     @property
     def is_logged_in(self) -> bool:
@@ -60,26 +68,39 @@ class InstagramAuth:
         """檢查是否需要 2FA 驗證"""
         return self._needs_2fa
     
+    def login_from_session(self) -> bool:
+        """只嘗試載入已保存的 session，不進行互動式登入
+
+        供無法使用 input()/getpass() 的環境（如背景工作行程）呼叫。
+        """
+        if self._is_logged_in:
+            return True
+
+        try:
+            self.logger.info("嘗試使用已保存的 session...")
+            self.loader.load_session_from_file(self.username)
+            self.logger.info("成功載入已保存的 session")
+            self._is_logged_in = True
+            return True
+        except FileNotFoundError:
+            self.logger.info("找不到已保存的 session，需要重新登入")
+            return False
+        except Exception as e:
+            self.logger.warning(f"載入 session 失敗: {e}")
+            return False
+
     def login(self, password: Optional[str] = None) -> bool:
         """支援 2FA 的登入函式"""
         if self._is_logged_in:
             return True
-            
+
         self.logger.info(f"正在登入使用者: {self.username}")
-        
+
         # 嘗試載入已保存的 session
         if self.use_saved_session:
-            try:
-                self.logger.info("嘗試使用已保存的 session...")
-                self.loader.load_session_from_file(self.username)
-                self.logger.info("成功載入已保存的 session")
-                self._is_logged_in = True
+            if self.login_from_session():
                 return True
-            except FileNotFoundError:
-                self.logger.info("找不到已保存的 session，需要重新登入")
-            except Exception as e:
-                self.logger.warning(f"載入 session 失敗: {e}")
-                self.logger.info("將進行全新登入")
+            self.logger.info("將進行全新登入")
         
         # 進行全新登入
         try:
@@ -3,16 +3,39 @@
 使用模組化設計，將功能分離到不同的模組中
 """
 import logging
-from typing import Optional, List
+import instaloader
+from typing import Optional, List, Tuple
 from src.models.models import PostData, ExtractResult
 from src.database.database import DatabaseManager
 from src.instagram.auth import InstagramAuth
 from src.instagram.profile import ProfileManager
 
+# 每篇貼文的日誌樣板（模組層級建立一次），單一 log 呼叫輸出整段，
+# 只經過一次 handler 鎖與 record 建立
+_POST_LOG_TMPL = (
+    "處理第 %d 篇新貼文:\n"
+    "       ID: %s\n"
+    "       作者: @%s\n"
+    "       時間: %s\n"
+    "       類型: %s\n"
+    "       互動: %s 讚, %s 留言\n"
+    "       內容預覽: %s"
+)
+
 
 class InstagramExtractor:
     """Instagram 貼文提取器類別 - 重構版本"""
-    
+
+    # 固定屬性集合：省去每個實例的 __dict__，屬性存取走 slot 位移
+    __slots__ = ('username', 'logger', 'db_manager', 'auth_manager', 'profile_manager')
+
+    # 串流提取時每累積多少篇貼文批次寫入一次
+    BATCH_FLUSH_SIZE = 500
+
+    # 內容預覽的最大字元數
+    MAX_PREVIEW = 100
+
+
     def __init__(self, 
                  username: str,
                  database_file: str = "food_map.db",
@@ -72,96 +95,165 @@ class InstagramExtractor:
         if profile is None:
             return ExtractResult(success=False, username=self.username, error="無法獲取個人檔案")
         
-        # 顯示資料庫現有資料
-        existing_count = self.db_manager.get_posts_count()
-        self.logger.info(f"資料庫現有貼文: {existing_count} 篇")
-        
-        # 載入所有已處理的貼文 ID 到記憶體
+        # 載入所有已處理的貼文 ID 到記憶體；現有筆數直接取 set 大小，
+        # 不用再跑一次資料庫查詢
         processed_set = self.db_manager.get_all_processed_ids()
+        existing_count = len(processed_set)
+        self.logger.info(f"資料庫現有貼文: {existing_count} 篇")
+
+        # 空資料庫的首次匯入：先卸下次要索引，結束後一次重建，
+        # 避免每列插入都重新平衡各索引的 B-tree
+        bulk_load = existing_count == 0
+        if bulk_load:
+            self.db_manager.drop_secondary_indexes()
         
         # 提取儲存貼文並直接存入資料庫
         self.logger.info("開始處理儲存貼文...")
         
+        # 上次同步時串流最前端的 shortcode；儲存清單由新到舊，
+        # 再次遇到它代表之後的貼文上次都看過了，可以提前停止
+        checkpoint = self.db_manager.get_sync_checkpoint()
+        newest_shortcode: Optional[str] = None
+
         count = 0
+        saved_count = 0
         total_found = 0
         skipped_count = 0
-        
+        interrupted = False
+        flush_failed = False
+        batch: list = []
+
+        # 熱迴圈用的區域別名：省去每篇貼文重複的屬性查找
+        logger = self.logger
+        save_batch = self.db_manager.save_posts_batch
+        flush_size = self.BATCH_FLUSH_SIZE
+        max_preview = self.MAX_PREVIEW
+
         try:
-            # 獲取儲存的貼文
+            # 獲取儲存的貼文（網路後端的產生器，邊抓邊處理不先全部載入）
             self.logger.info("正在獲取儲存貼文清單...")
             saved_posts = profile.get_saved_posts()
-            
-            # 先收集所有儲存貼文的 shortcode 到 set
-            self.logger.info("正在分析儲存貼文...")
-            saved_posts_list = list(saved_posts)  # 轉換為 list 以便重複使用
-            saved_shortcodes = {post.shortcode for post in saved_posts_list}
-            total_found = len(saved_shortcodes)
-            
-            # 使用 set 差集直接找出需要處理的貼文
-            new_shortcodes = saved_shortcodes - processed_set
-            skipped_count = total_found - len(new_shortcodes)
-            
-            self.logger.info(f"找到 {total_found} 篇儲存貼文，其中 {len(new_shortcodes)} 篇為新貼文")
-            if skipped_count > 0:
-                self.logger.info(f"跳過 {skipped_count} 篇已處理貼文")
-            
-            self.logger.info("開始處理新貼文...")
-            
-            # 只處理新的貼文
-            for post in saved_posts_list:
-                if post.shortcode not in new_shortcodes:
-                    continue  # 跳過已處理的貼文
-                
-                # 移除數量限制，提取所有儲存的貼文
-                
+
+            self.logger.info("開始處理儲存貼文（串流模式）...")
+
+            for post in saved_posts:
+                total_found += 1
+
+                # 記住本次串流最前端的貼文，成功結束後存為新檢查點
+                if newest_shortcode is None:
+                    newest_shortcode = post.shortcode
+
+                # 到達上次同步位置，後面的貼文不用再向 Instagram 要
+                if post.shortcode == checkpoint:
+                    skipped_count += 1
+                    logger.info("已到達上次同步位置（%s），提前停止", checkpoint)
+                    break
+
+                # 已處理過的貼文直接跳過（檢查點遺漏時的保險），
+                # 不用先收集完整清單再做差集
+                if post.shortcode in processed_set:
+                    skipped_count += 1
+                    continue
+
                 try:
-                    self.logger.info(f"處理第 {count + 1} 篇新貼文:")
-                    self.logger.info(f"       ID: {post.shortcode}")
-                    self.logger.info(f"       作者: @{post.owner_username}")
-                    self.logger.info(f"       時間: {post.date_utc}")
-                    self.logger.info(f"       類型: {'影片' if post.is_video else '圖片'}")
-                    self.logger.info(f"       互動: {post.likes:,} 讚, {post.comments:,} 留言")
-                    
-                    # 直接儲存到資料庫
-                    if self.db_manager.save_post(post):
-                        count += 1
-                        self.logger.info("       ✅ 已儲存到資料庫")
-                        
-                        # 顯示文字內容預覽
-                        if post.caption:
-                            preview = post.caption[:100] + "..." if len(post.caption) > 100 else post.caption
-                            self.logger.info(f"       內容預覽: {preview}")
+                    # 層級檢查一次做完，關閉 INFO 時整段格式化成本歸零；
+                    # 整篇貼文的資訊用單一 log 呼叫輸出
+                    if logger.isEnabledFor(logging.INFO):
+                        # 內容預覽以切片試探是否超長，不掃整段 caption
+                        caption = post.caption or ""
+                        if caption:
+                            preview = caption[:max_preview]
+                            if caption[max_preview:max_preview + 1]:
+                                preview += "..."
                         else:
-                            self.logger.info("       內容預覽: （無文字內容）")
-                    else:
-                        self.logger.warning("       ⚠️ 跳過（可能重複）")
-                    
-                except KeyboardInterrupt:
-                    self.logger.info("使用者中斷處理")
-                    break
-                except Exception as e:
-                    self.logger.error(f"       ❌ 處理失敗: {e}")
+                            preview = "（無文字內容）"
+                        logger.info(
+                            _POST_LOG_TMPL,
+                            count + 1, post.shortcode, post.owner_username,
+                            post.date_utc, '影片' if post.is_video else '圖片',
+                            f"{post.likes:,}", f"{post.comments:,}", preview
+                        )
+
+                    # 先累積到批次緩衝，滿 500 篇一次寫入
+                    batch.append(post)
+                    count += 1
+
+                    if len(batch) >= flush_size:
+                        saved_count += save_batch(batch)
+                        logger.info("已批次寫入 %d 篇貼文", len(batch))
+                        batch.clear()
+
+                except instaloader.exceptions.InstaloaderException as e:
+                    logger.error(f"       ❌ 處理失敗: {e}")
                     continue
-        
+
+            self.logger.info(f"找到 {total_found} 篇儲存貼文，其中 {count} 篇為新貼文")
+            if skipped_count > 0:
+                self.logger.info(f"跳過 {skipped_count} 篇已處理貼文")
+
+        except KeyboardInterrupt:
+            # 中斷時不重拋：已累積的批次仍會寫入，檢查點維持不動
+            self.logger.info("使用者中斷處理，已處理 %d 篇新貼文", count)
+            interrupted = True
         except Exception as e:
             self.logger.error(f"處理儲存貼文失敗: {e}")
             self.logger.error(f"錯誤類型: {type(e).__name__}")
-            return ExtractResult(success=False, username=self.username, error=str(e))
-        
-        # 顯示處理結果
-        final_count = self.db_manager.get_posts_count()
-        new_count = final_count - existing_count
-        
+            # 中斷前已累積的貼文仍嘗試寫入資料庫
+            if batch:
+                try:
+                    saved_count += self.db_manager.save_posts_batch(batch)
+                except Exception as flush_err:
+                    self.logger.error(f"清空剩餘批次失敗，{len(batch)} 篇貼文未寫入: {flush_err}")
+            if bulk_load:
+                self.db_manager.rebuild_secondary_indexes()
+            return ExtractResult(
+                success=False,
+                username=self.username,
+                total_found=total_found,
+                new_posts=saved_count,
+                skipped_posts=skipped_count,
+                total_in_db=existing_count + saved_count,
+                error=str(e)
+            )
+
+        # 寫入最後一批
+        if batch:
+            try:
+                saved_count += self.db_manager.save_posts_batch(batch)
+                self.logger.info("已批次寫入 %d 篇貼文", len(batch))
+            except Exception as flush_err:
+                flush_failed = True
+                self.logger.error(f"寫入最後一批失敗，{len(batch)} 篇貼文未寫入: {flush_err}")
+
+        # 首次匯入完成，以排序掃描一次重建次要索引
+        if bulk_load:
+            self.db_manager.rebuild_secondary_indexes()
+
+        # 串流完整走完且每批都寫入成功才更新檢查點；中斷或寫入失敗時
+        # 不動，避免下次提取在檢查點早停、永遠跳過沒存進資料庫的貼文
+        if (not interrupted and not flush_failed
+                and newest_shortcode and newest_shortcode != checkpoint):
+            self.db_manager.set_sync_checkpoint(newest_shortcode)
+
+
+        # 顯示處理結果：新增數取批次寫入實際回報的筆數，
+        # 總數由記憶體中的值相加即可
+        new_count = saved_count
+        final_count = existing_count + new_count
+
         result = ExtractResult(
-            success=True,
+            success=not flush_failed,
             username=self.username,
             total_found=total_found,
             new_posts=new_count,
             skipped_posts=skipped_count,
-            total_in_db=final_count
+            total_in_db=final_count,
+            error="部分批次寫入失敗" if flush_failed else None
         )
-        
+
         if new_count > 0:
+            # 大量寫入後更新統計，讓後續查詢的索引選擇維持準確
+            self.db_manager.analyze()
             self.logger.info("處理完成！")
             self.logger.info(f"新增 {new_count} 篇貼文到資料庫")
             self.logger.info(f"資料庫總計: {final_count} 篇貼文")
@@ -177,10 +269,16 @@ class InstagramExtractor:
         self.logger.info(f"資料庫檔案: {self.db_manager.database_file}")
         return result
     
-    def get_posts_from_db(self, limit: Optional[int] = None, offset: int = 0) -> List[PostData]:
+    def get_posts_from_db(self, limit: Optional[int] = None, offset: int = 0,
+                          cursor_key: Optional[Tuple[str, str]] = None) -> List[PostData]:
         """從資料庫獲取貼文資料"""
-        return self.db_manager.get_posts(limit, offset)
+        return self.db_manager.get_posts(limit, offset, cursor_key)
     
+    def iter_posts_from_db(self, limit: Optional[int] = None, offset: int = 0,
+                           cursor_key: Optional[Tuple[str, str]] = None):
+        """以產生器逐批讀取貼文，供串流回應使用"""
+        return self.db_manager.iter_posts(limit, offset, cursor_key)
+
     def search_posts(self, keyword: str, limit: Optional[int] = None) -> List[PostData]:
         """在資料庫中搜尋包含關鍵字的貼文"""
         return self.db_manager.search_posts(keyword, limit)
@@ -188,6 +286,10 @@ class InstagramExtractor:
     def get_posts_count(self) -> int:
         """取得已處理的貼文數量"""
         return self.db_manager.get_posts_count()
+
+    def get_author_statistics(self) -> List[dict]:
+        """取得各作者的貼文統計"""
+        return self.db_manager.get_author_statistics()
     
     def update_post_metadata(self, post_id: str, parsed_store: Optional[str] = None, parsed_address: Optional[str] = None) -> bool:
         """更新貼文的解析店家和地址資訊"""
@@ -197,13 +299,15 @@ class InstagramExtractor:
         """批次更新多個貼文的解析店家和地址資訊"""
         return self.db_manager.batch_update_post_metadata(updates)
     
-    def get_unparsed_posts(self, limit: Optional[int] = None, offset: int = 0) -> List[dict]:
+    def get_unparsed_posts(self, limit: Optional[int] = None, offset: int = 0,
+                           cursor_key: Optional[Tuple[str, str]] = None) -> List[dict]:
         """獲取尚未解析店家和地址的貼文"""
-        return self.db_manager.get_unparsed_posts(limit, offset)
+        return self.db_manager.get_unparsed_posts(limit, offset, cursor_key)
     
-    def get_parsed_posts(self, limit: Optional[int] = None, offset: int = 0) -> List[dict]:
+    def get_parsed_posts(self, limit: Optional[int] = None, offset: int = 0,
+                         cursor_key: Optional[Tuple[str, str]] = None) -> List[dict]:
         """獲取已解析且地址不為空的貼文"""
-        return self.db_manager.get_parsed_posts(limit, offset)
+        return self.db_manager.get_parsed_posts(limit, offset, cursor_key)
     
     def delete_post_by_id(self, post_id: str, unsave_from_instagram: bool = True) -> bool:
         """
@@ -283,4 +387,5 @@ class InstagramExtractor:
         """清理資源"""
         self.auth_manager.close()
         self.db_manager.clear_cache()
+        self.db_manager.close()
         self.profile_manager.clear_cache()
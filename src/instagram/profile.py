@@ -4,24 +4,32 @@ Instagram 個人檔案管理模組
 """
 import instaloader
 import logging
+from collections import OrderedDict
 from typing import Optional
 from ..models.models import UserProfile
 
 
 class ProfileManager:
     """個人檔案管理器"""
-    
+
+    # 固定屬性集合：省去每個實例的 __dict__，屬性存取走 slot 位移
+    __slots__ = ('auth_manager', 'logger', '_profile_cache')
+
+    # 個人檔案 LRU 快取的容量上限
+    PROFILE_CACHE_SIZE = 16
+
     def __init__(self, auth_manager, logger: Optional[logging.Logger] = None):
         """
         初始化個人檔案管理器
-        
+
         Args:
             auth_manager: 認證管理器實例
             logger: 日誌記錄器
         """
         self.auth_manager = auth_manager
         self.logger = logger or self._setup_default_logger()
-        self._profile_cache: Optional[instaloader.Profile] = None
+        # 以使用者名稱為鍵的 LRU 快取，重複查詢同一帳號不再打 Instagram
+        self._profile_cache: OrderedDict[str, instaloader.Profile] = OrderedDict()
     
     def _setup_default_logger(self) -> logging.Logger:
         """設定預設日誌記錄器"""
@@ -42,12 +50,13 @@ class ProfileManager:
             username: 使用者名稱，如果不提供則使用認證管理器中的使用者名稱
         """
         target_username = username or self.auth_manager.username
-        
-        # 如果是相同的使用者且有快取，直接返回
-        if (self._profile_cache is not None and 
-            self._profile_cache.username == target_username):
-            return self._profile_cache
-            
+
+        # 快取命中：移到 LRU 末端後直接返回
+        cached = self._profile_cache.get(target_username)
+        if cached is not None:
+            self._profile_cache.move_to_end(target_username)
+            return cached
+
         if not self.auth_manager.is_logged_in:
             self.logger.error("尚未登入，無法獲取個人檔案")
             return None
@@ -59,9 +68,10 @@ class ProfileManager:
                 target_username
             )
             
-            # 如果是認證使用者，則快取
-            if target_username == self.auth_manager.username:
-                self._profile_cache = profile
+            # 寫入 LRU 快取，超過容量時淘汰最久未使用的項目
+            self._profile_cache[target_username] = profile
+            if len(self._profile_cache) > self.PROFILE_CACHE_SIZE:
+                self._profile_cache.popitem(last=False)
             
             self.logger.info("個人檔案資訊:")
             self.logger.info(f"       全名: {profile.full_name}")
@@ -101,4 +111,4 @@ class ProfileManager:
     
     def clear_cache(self):
         """清除快取"""
-        self._profile_cache = None
+        self._profile_cache.clear()
@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class PostData:
     """貼文資料結構"""
     post_id: str
@@ -35,7 +35,7 @@ class PostData:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtractResult:
     """提取結果資料結構"""
     success: bool
@@ -59,7 +59,7 @@ class ExtractResult:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class UserProfile:
     """使用者個人檔案資料結構"""
     username: str